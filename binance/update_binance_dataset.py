@@ -7,6 +7,7 @@ import pandas as pd
 from datetime import timedelta
 from binance.client import Client
 from tqdm.autonotebook import tqdm
+from update_features import update_features, candle_paths
 
 class UnifiedDataDownloader:
     """
@@ -263,3 +264,6 @@ if __name__ == "__main__":
         print(f"\nDescargando datos para {ticker} en carpeta: {output_directory}")
         downloader = UnifiedDataDownloader(ticker, output_directory)
         downloader.download(intervals, save_csv=True)
+
+    # Recalcular los indicadores derivados solo sobre las velas nuevas, una serie por proceso
+    update_features(candle_paths(tickers, intervals))
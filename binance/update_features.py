@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import json
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+class FeatureBuilder:
+    """
+    Calcula indicadores derivados sobre los CSV de velas de Binance y los guarda junto a ellos
+    en {ticker}_{interval}_features.csv.
+
+    Indicadores (vectorizados con pandas):
+      - log_return: retorno logarítmico del cierre.
+      - volatility_{w}: desviación típica móvil de log_return en ventanas de w velas.
+      - vwap: precio medio ponderado de cada vela (quote_asset_volume / volume).
+      - vwap_{w}: VWAP móvil en ventanas de w velas.
+      - taker_buy_ratio: proporción del volumen comprada por takers (taker_buy_base_vol / volume).
+
+    Si ya existe el fichero de indicadores con las mismas columnas, solo se leen y recalculan las velas
+    de la cola afectada por las velas nuevas (desde la última fila guardada, que se reescribe), más las
+    velas previas que necesitan las ventanas.
+    """
+
+    def __init__(self, vol_windows=(20,), vwap_window=20):
+        """
+        :param vol_windows: Tamaños de ventana (en velas) para la volatilidad móvil.
+        :param vwap_window: Tamaño de ventana (en velas) para el VWAP móvil.
+        """
+        self.vol_windows = list(vol_windows)
+        self.vwap_window = vwap_window
+        # Velas previas necesarias para que la primera fila recalculada tenga ventanas completas
+        self.lookback = max(self.vol_windows + [self.vwap_window])
+
+    def features_filename(self, csv_path):
+        """
+        Devuelve la ruta del fichero de indicadores asociado a un CSV de velas.
+        """
+        root, ext = os.path.splitext(csv_path)
+        return f"{root}_features{ext}"
+
+    def columns(self):
+        """
+        Devuelve las columnas del fichero de indicadores en el orden en que las genera compute().
+        """
+        return (
+            ["open_time", "log_return"]
+            + [f"volatility_{window}" for window in self.vol_windows]
+            + ["vwap", f"vwap_{self.vwap_window}", "taker_buy_ratio"]
+        )
+
+    def compute(self, candles):
+        """
+        Calcula los indicadores para un DataFrame de velas con las columnas de Binance.
+
+        :param candles: DataFrame con open_time, close, volume, quote_asset_volume y taker_buy_base_vol.
+        :return: DataFrame de indicadores indexado igual que candles.
+        """
+        close = candles["close"].astype(float)
+        volume = candles["volume"].astype(float).replace(0, np.nan)
+        quote_volume = candles["quote_asset_volume"].astype(float)
+
+        features = pd.DataFrame({"open_time": candles["open_time"]})
+        features["log_return"] = np.log(close).diff()
+        for window in self.vol_windows:
+            features[f"volatility_{window}"] = features["log_return"].rolling(window, min_periods=window).std()
+        features["vwap"] = quote_volume / volume
+        features[f"vwap_{self.vwap_window}"] = (
+            quote_volume.rolling(self.vwap_window, min_periods=self.vwap_window).sum()
+            / volume.rolling(self.vwap_window, min_periods=self.vwap_window).sum()
+        )
+        features["taker_buy_ratio"] = candles["taker_buy_base_vol"].astype(float) / volume
+        return features[self.columns()]
+
+    def read_last_line(self, path):
+        """
+        Lee la última línea no vacía de un fichero sin cargarlo entero.
+
+        :return: Tupla (offset en bytes donde empieza la línea, contenido de la línea).
+        """
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            data = b""
+            while pos > 0:
+                step = min(4096, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+                stripped = data.rstrip(b"\r\n")
+                idx = stripped.rfind(b"\n")
+                if idx != -1:
+                    return pos + idx + 1, stripped[idx + 1:].decode("utf-8")
+            return 0, data.rstrip(b"\r\n").decode("utf-8")
+
+    def read_first_line(self, path):
+        """
+        Lee la primera línea (la cabecera) de un fichero.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            return f.readline().rstrip("\r\n")
+
+    def read_candles_tail(self, csv_path, last_time, block_size=1 << 20):
+        """
+        Lee desde el final de un CSV de velas la fila con open_time == last_time y las
+        self.lookback filas anteriores, sin recorrer el resto del fichero.
+
+        :return: Bytes con la cabecera y las líneas leídas, o None si last_time no aparece.
+        """
+        prefix = f"{last_time},".encode("utf-8")
+        with open(csv_path, "rb") as f:
+            header = f.readline()
+            header_end = f.tell()
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            data = b""
+            while pos > header_end:
+                step = min(block_size, pos - header_end)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+                lines = data.splitlines(keepends=True)
+                # Si no se ha llegado a la cabecera, la primera línea puede estar cortada
+                complete = lines if pos == header_end else lines[1:]
+                for idx in range(len(complete) - 1, -1, -1):
+                    if complete[idx].startswith(prefix):
+                        if idx >= self.lookback or pos == header_end:
+                            start = max(0, idx - self.lookback)
+                            return header + b"".join(complete[start:])
+                        break
+        return None
+
+    def update_file(self, csv_path):
+        """
+        Calcula o actualiza los indicadores de un CSV de velas.
+
+        :param csv_path: Ruta del CSV de velas (ej.: "btc/BTCUSDT_15m.csv").
+        :return: Tupla (ruta del fichero de indicadores, número de filas escritas).
+        """
+        features_file = self.features_filename(csv_path)
+
+        tail = None
+        if os.path.isfile(features_file):
+            offset, last_line = self.read_last_line(features_file)
+            # Si cambió la configuración de ventanas, la última fila es la cabecera
+            # o su vela ya no existe, se recalcula todo
+            if offset > 0 and self.read_first_line(features_file) == ",".join(self.columns()):
+                last_time = last_line.split(",")[0]
+                tail = self.read_candles_tail(csv_path, last_time)
+
+        if tail is None:
+            try:
+                candles = pd.read_csv(csv_path, header=0)
+            except pd.errors.EmptyDataError:
+                return features_file, 0
+            if candles.empty:
+                return features_file, 0
+            features = self.compute(candles)
+            features.to_csv(features_file, index=False, header=True)
+            return features_file, len(features)
+
+        # Recalcular desde la última fila guardada, incluyendo las velas previas que piden las ventanas
+        candles = pd.read_csv(io.BytesIO(tail), header=0)
+        position = int(candles["open_time"].searchsorted(last_time))
+        features = self.compute(candles).iloc[position:]
+        with open(features_file, "r+b") as f:
+            f.truncate(offset)
+        features.to_csv(features_file, mode="a", index=False, header=False)
+        return features_file, len(features)
+
+def update_features(csv_paths, builder=None, max_workers=None):
+    """
+    Actualiza los indicadores de varios CSV de velas repartiendo cada serie en un pool de procesos.
+
+    :param csv_paths: Lista de rutas de CSV de velas.
+    :param builder: FeatureBuilder a usar (por defecto, uno con los parámetros por defecto).
+    :param max_workers: Número máximo de procesos (por defecto, el número de CPUs).
+    :return: Diccionario ruta del CSV -> número de filas de indicadores escritas.
+    """
+    builder = builder or FeatureBuilder()
+    csv_paths = [path for path in csv_paths if os.path.isfile(path)]
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(builder.update_file, path): path for path in csv_paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                features_file, rows = future.result()
+                results[path] = rows
+                print(f"Indicadores actualizados en: {features_file} ({rows} filas)")
+            except Exception as e:
+                print(f"  Error al calcular indicadores para {path}: {e}")
+    return results
+
+def candle_paths(tickers, intervals):
+    """
+    Devuelve las rutas de los CSV de velas que genera update_binance_dataset.py para los tickers dados.
+    """
+    paths = []
+    for ticker in tickers:
+        folder_name = ticker.replace("USDT", "").lower()
+        for interval in intervals:
+            paths.append(os.path.join(folder_name, f"{ticker}_{interval}.csv"))
+    return paths
+
+if __name__ == "__main__":
+    with open("cryptos.txt", "r", encoding="utf-8") as f:
+        tickers = json.load(f)
+
+    intervals = ["1d", "1wk", "1mo", "1m", "5m", "15m", "30m", "1h"]
+    update_features(candle_paths(tickers, intervals))
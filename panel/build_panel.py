@@ -0,0 +1,386 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import json
+import numpy as np
+import pandas as pd
+
+class PanelBuilder:
+    """
+    Construye un panel alineado (tiempo × activo × campo) a partir de los CSV generados por los
+    scripts de Binance y yfinance (criptomonedas, forex y acciones).
+
+    Cada activo se alinea sobre una rejilla temporal común por intervalo y los huecos se rellenan
+    según una política explícita por campo. El resultado se guarda como arrays memory-mapped
+    (np.memmap) junto con un JSON de metadatos, de modo que una nueva ejecución solo reescribe las
+    filas a partir de la última vela real más antigua entre los activos (cada fuente se actualiza
+    con su propio calendario) y añade las velas nuevas al final, sin reconstruir el array completo.
+    """
+
+    # Frecuencias de pandas para los intervalos de tamaño fijo
+    fixed_freqs = {
+        "1m": "1min",
+        "2m": "2min",
+        "5m": "5min",
+        "15m": "15min",
+        "30m": "30min",
+        "60m": "1h",
+        "90m": "90min",
+        "1h": "1h",
+        "1d": "1D",
+    }
+    # Intervalos de calendario (semanas que empiezan en lunes y meses naturales)
+    calendar_freqs = {
+        "1wk": "W-MON",
+        "1mo": "MS",
+    }
+    # Posibles nombres de la columna temporal según el script de origen
+    time_columns = ["datetime", "open_time", "date"]
+    # Políticas de relleno reconocidas
+    fill_policies = {"ffill", "zero", "nan"}
+    # Campos que por defecto se rellenan con cero (sin vela no hay volumen ni operaciones)
+    zero_fill_fields = {"volume", "quote_asset_volume", "num_trades", "taker_buy_base_vol", "taker_buy_quote_vol"}
+
+    def __init__(self, assets, fields, output_dir, fill_policies=None, grid="regular", dtype="float32"):
+        """
+        :param assets: Lista de diccionarios {"name", "csv_dir", "ticker"}; el CSV de cada intervalo
+                       se busca en csv_dir/{ticker}_{interval}.csv.
+        :param fields: Lista de campos a incluir, por ejemplo ["open", "high", "low", "close", "volume"].
+        :param output_dir: Directorio donde se guardarán los arrays y los metadatos.
+        :param fill_policies: Diccionario campo -> política ("ffill", "zero" o "nan").
+                              Por defecto "zero" para campos de volumen y "ffill" para el resto.
+        :param grid: "regular" (rejilla continua 24/7 del intervalo) o "union" (solo los instantes
+                     en los que al menos un activo tiene vela).
+        :param dtype: Tipo numérico del array de salida.
+        """
+        if grid not in ("regular", "union"):
+            raise Exception(f"Rejilla {grid} no reconocida.")
+        self.assets = assets
+        self.fields = [field.lower() for field in fields]
+        self.output_dir = output_dir
+        self.grid = grid
+        self.dtype = np.dtype(dtype)
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        self.fill = {}
+        for field in self.fields:
+            default = "zero" if field in self.zero_fill_fields else "ffill"
+            self.fill[field] = (fill_policies or {}).get(field, default)
+            if self.fill[field] not in self.fill_policies:
+                raise Exception(f"Política de relleno {self.fill[field]} no reconocida para el campo {field}.")
+
+    def paths(self, interval):
+        """
+        Devuelve las rutas de los ficheros del panel para un intervalo.
+        """
+        prefix = os.path.join(self.output_dir, f"panel_{interval}")
+        return {
+            "meta": f"{prefix}.json",
+            "data": f"{prefix}.dat",
+            "mask": f"{prefix}_mask.dat",
+            "time": f"{prefix}_time.dat",
+        }
+
+    def align_times(self, times, interval):
+        """
+        Asigna a cada vela la etiqueta de la celda de la rejilla que contiene su cierre, para que
+        ninguna vela desalineada (ej.: acciones de 60m que abren a las 9:30 ET) aporte datos futuros
+        a una celda anterior.
+        - Intradiarios: se pasa a UTC sin zona horaria y se etiqueta con ceil(cierre) - paso.
+        - Diarios, semanales y mensuales: se usa la fecha local de la sesión, cuyo cierre cae en ese
+          mismo día UTC para las fuentes del proyecto.
+        """
+        if interval in self.fixed_freqs and interval != "1d":
+            freq = self.fixed_freqs[interval]
+            step = pd.Timedelta(freq)
+            times = pd.to_datetime(times, utc=True, errors='coerce').dt.tz_localize(None)
+            return (times + step).dt.ceil(freq) - step
+        # Fecha local (los diez primeros caracteres) sin convertir de zona horaria
+        dates = pd.to_datetime(times.astype(str).str[:10], format="%Y-%m-%d", errors='coerce')
+        if interval == "1d":
+            return dates
+        if interval == "1wk":
+            return dates.dt.to_period("W-SUN").dt.start_time
+        if interval == "1mo":
+            return dates.dt.to_period("M").dt.start_time
+        raise Exception(f"Intervalo {interval} no soportado por el panel.")
+
+    def read_tail(self, filename, time_index, interval, since, block_size=1 << 20):
+        """
+        Lee un CSV ordenado por tiempo desde el final hasta la primera vela con etiqueta < since,
+        sin recorrer el resto del fichero.
+
+        :param time_index: Posición de la columna temporal en cada línea.
+        :return: Bytes con la cabecera y las líneas leídas.
+        """
+        with open(filename, "rb") as f:
+            header = f.readline()
+            header_end = f.tell()
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            data = b""
+            while pos > header_end:
+                step = min(block_size, pos - header_end)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+                if pos == header_end:
+                    break
+                # La primera línea del bloque puede estar cortada; se comprueba la siguiente completa
+                first = data.find(b"\n")
+                second = data.find(b"\n", first + 1)
+                if first == -1 or second == -1:
+                    continue
+                fields = data[first + 1:second].decode("utf-8").split(",")
+                if len(fields) <= time_index:
+                    continue
+                label = self.align_times(pd.Series([fields[time_index]]), interval).iloc[0]
+                if pd.notna(label) and label < since:
+                    data = data[first + 1:]
+                    break
+        return header + data
+
+    def load_asset(self, asset, interval, since=None):
+        """
+        Lee el CSV de un activo, unifica nombres de columna y devuelve un DataFrame indexado por
+        tiempo alineado con los campos solicitados (NaN si el origen no los tiene).
+        Solo se cargan la columna temporal y los campos pedidos.
+
+        :param since: Si se indica, solo se leen desde el final del fichero las velas con tiempo >= since.
+        """
+        empty = pd.DataFrame(columns=self.fields, dtype=self.dtype)
+        filename = os.path.join(asset["csv_dir"], f"{asset['ticker']}_{interval}.csv")
+        if not os.path.isfile(filename) or os.path.getsize(filename) == 0:
+            print(f"  No existe {filename} o está vacío; {asset['name']} quedará vacío en este intervalo.")
+            return empty
+
+        with open(filename, "r", encoding="utf-8") as f:
+            header = [col.strip().lower() for col in f.readline().split(",")]
+        time_col = next((col for col in self.time_columns if col in header), None)
+        if time_col is None:
+            print(f"  {filename} no tiene columna temporal reconocida.")
+            return empty
+
+        wanted = {time_col} | set(self.fields)
+        source = filename
+        if since is not None:
+            source = io.BytesIO(self.read_tail(filename, header.index(time_col), interval, since))
+        try:
+            df = pd.read_csv(source, usecols=lambda col: col.strip().lower() in wanted)
+        except pd.errors.EmptyDataError:
+            print(f"  {filename} está vacío; {asset['name']} quedará vacío en este intervalo.")
+            return empty
+        df.columns = [str(col).strip().lower() for col in df.columns]
+
+        times = self.align_times(df[time_col], interval)
+        df = df.reindex(columns=self.fields).apply(pd.to_numeric, errors='coerce')
+        df.index = pd.DatetimeIndex(times)
+        df = df[df.index.notna()]
+        df = df[~df.index.duplicated(keep='last')].sort_index()
+        if since is not None:
+            df = df[df.index >= since]
+        return df.astype(self.dtype)
+
+    def build_grid(self, frames, interval, start):
+        """
+        Construye la rejilla temporal común desde start hasta la última vela disponible.
+        """
+        ends = [df.index[-1] for df in frames.values() if not df.empty]
+        if not ends:
+            return pd.DatetimeIndex([])
+        end = max(ends)
+        if self.grid == "union":
+            grid = pd.DatetimeIndex([])
+            for df in frames.values():
+                grid = grid.union(df.index)
+            return grid[grid >= start]
+        freq = self.fixed_freqs.get(interval) or self.calendar_freqs[interval]
+        return pd.date_range(start, end, freq=freq)
+
+    def read_meta(self, interval):
+        """
+        Lee los metadatos de un panel existente. Devuelve None si no existe o si la configuración
+        (activos, campos, políticas, rejilla o tipo) no coincide con la actual.
+        """
+        meta_file = self.paths(interval)["meta"]
+        if not os.path.isfile(meta_file):
+            return None
+        with open(meta_file, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        same_config = (
+            meta["assets"] == [asset["name"] for asset in self.assets]
+            and meta["fields"] == self.fields
+            and meta["fill_policies"] == self.fill
+            and meta["grid"] == self.grid
+            and meta["dtype"] == self.dtype.name
+            and "last_times" in meta
+        )
+        if not same_config:
+            print(f"La configuración del panel {interval} ha cambiado. Se reconstruirá desde cero.")
+            return None
+        return meta
+
+    def update_interval(self, interval, rebuild=False):
+        """
+        Construye o actualiza el panel de un intervalo.
+        - Si no existe panel previo (o cambió la configuración), se construye con todo el historial.
+        - Si existe, se reescriben las filas desde la última vela real más antigua entre los activos
+          (un activo retrasado puede recibir después velas anteriores al final del panel, y la última
+          vela pudo estar incompleta) y se añaden al final las filas nuevas, sin tocar el resto del array.
+
+        :param interval: Intervalo en formato unificado (ej.: "15m").
+        :param rebuild: Si True, ignora el panel existente y lo construye desde cero.
+        :return: Diccionario de metadatos del panel.
+        """
+        paths = self.paths(interval)
+        meta = None if rebuild else self.read_meta(interval)
+        n_assets, n_fields = len(self.assets), len(self.fields)
+
+        frames = {}
+        if meta is not None:
+            known = [pd.Timestamp(t) for t in meta["last_times"].values() if t is not None]
+            start = min(known) if known else pd.Timestamp(meta["start"])
+            for asset in self.assets:
+                # Los activos sin velas previas se leen enteros por si su CSV apareció después
+                since = start if meta["last_times"].get(asset["name"]) is not None else None
+                frames[asset["name"]] = self.load_asset(asset, interval, since=since)
+            new_starts = [df.index[0] for df in frames.values() if not df.empty]
+            if new_starts and min(new_starts) < start:
+                start = min(new_starts)
+                if start < pd.Timestamp(meta["start"]):
+                    print(f"Hay velas anteriores al inicio del panel {interval}. Se reconstruirá desde cero.")
+                    return self.update_interval(interval, rebuild=True)
+                # Releer el resto de activos desde el nuevo punto de reescritura
+                for asset in self.assets:
+                    if meta["last_times"].get(asset["name"]) is not None:
+                        frames[asset["name"]] = self.load_asset(asset, interval, since=start)
+                for name, df in frames.items():
+                    frames[name] = df[df.index >= start]
+
+            stored = np.memmap(paths["time"], dtype=np.int64, mode="r", shape=(meta["shape"][0],))
+            offset = int(np.searchsorted(stored, start.value))
+            del stored
+            first = meta["start"]
+            print(f"Actualizando panel {interval} desde {start}")
+        else:
+            print(f"Construyendo panel {interval} desde cero")
+            for asset in self.assets:
+                frames[asset["name"]] = self.load_asset(asset, interval)
+            starts = [df.index[0] for df in frames.values() if not df.empty]
+            if not starts:
+                print(f"  No hay datos para el intervalo {interval}.")
+                return meta
+            offset = 0
+            start = min(starts)
+            first = str(start)
+
+        grid = self.build_grid(frames, interval, start)
+        if len(grid) == 0:
+            print(f"  No hay velas nuevas para el intervalo {interval}.")
+            return meta
+
+        n_times = offset + len(grid)
+        shape = (n_times, n_assets, n_fields)
+        mode = "r+" if offset > 0 else "w+"
+        if offset > 0:
+            # Ajustar el tamaño de los ficheros existentes; las filas anteriores a offset no se modifican
+            for key, row_bytes in (
+                ("data", n_assets * n_fields * self.dtype.itemsize),
+                ("mask", n_assets),
+                ("time", 8),
+            ):
+                with open(paths[key], "r+b") as f:
+                    f.truncate(n_times * row_bytes)
+
+        data = np.memmap(paths["data"], dtype=self.dtype, mode=mode, shape=shape)
+        mask = np.memmap(paths["mask"], dtype=np.bool_, mode=mode, shape=(n_times, n_assets))
+        time = np.memmap(paths["time"], dtype=np.int64, mode=mode, shape=(n_times,))
+
+        last_times = dict(meta["last_times"]) if meta is not None else {}
+        for a, asset in enumerate(self.assets):
+            frame = frames[asset["name"]]
+            if not frame.empty:
+                last_times[asset["name"]] = str(frame.index[-1])
+            else:
+                last_times.setdefault(asset["name"], None)
+            block = frame.reindex(grid)
+            mask[offset:, a] = block.notna().any(axis=1).to_numpy()
+            for f, field in enumerate(self.fields):
+                values = block[field].copy()
+                policy = self.fill[field]
+                if policy == "ffill":
+                    # Sembrar con la fila anterior del panel para continuar el relleno entre ejecuciones
+                    if offset > 0 and pd.isna(values.iloc[0]):
+                        values.iloc[0] = data[offset - 1, a, f]
+                    values = values.ffill()
+                elif policy == "zero":
+                    values = values.fillna(0)
+                data[offset:, a, f] = values.to_numpy(dtype=self.dtype)
+
+        time[offset:] = grid.values.astype("datetime64[ns]").view(np.int64)
+        for array in (data, mask, time):
+            array.flush()
+        del data, mask, time
+
+        meta = {
+            "interval": interval,
+            "grid": self.grid,
+            "assets": [asset["name"] for asset in self.assets],
+            "fields": self.fields,
+            "fill_policies": self.fill,
+            "dtype": self.dtype.name,
+            "shape": list(shape),
+            "start": first,
+            "end": str(grid[-1]),
+            "last_times": last_times,
+            "files": {key: os.path.basename(path) for key, path in paths.items() if key != "meta"},
+        }
+        with open(paths["meta"], "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=4)
+        print(f"  Panel {interval} guardado con forma {tuple(shape)} en: {self.output_dir}")
+        return meta
+
+    def update(self, intervals):
+        """
+        Construye o actualiza el panel de una lista de intervalos.
+
+        :param intervals: Lista de intervalos deseados (ej.: ["1d", "1h", "15m"]).
+        :return: Diccionario con intervalos como llaves y metadatos como valores.
+        """
+        results = {}
+        for interval in intervals:
+            results[interval] = self.update_interval(interval)
+        return results
+
+def load_panel(output_dir, interval):
+    """
+    Abre en solo lectura el panel de un intervalo.
+
+    :return: Tupla (data, mask, times, meta) donde data es un np.memmap (tiempo × activo × campo),
+             mask indica qué celdas tienen vela real (no rellenada) y times es un DatetimeIndex.
+    """
+    prefix = os.path.join(output_dir, f"panel_{interval}")
+    with open(f"{prefix}.json", "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    shape = tuple(meta["shape"])
+    data = np.memmap(os.path.join(output_dir, meta["files"]["data"]), dtype=meta["dtype"], mode="r", shape=shape)
+    mask = np.memmap(os.path.join(output_dir, meta["files"]["mask"]), dtype=np.bool_, mode="r", shape=shape[:2])
+    time = np.memmap(os.path.join(output_dir, meta["files"]["time"]), dtype=np.int64, mode="r", shape=shape[:1])
+    return data, mask, pd.DatetimeIndex(np.asarray(time).view("datetime64[ns]")), meta
+
+if __name__ == "__main__":
+    # Se espera que 'panel.txt' contenga un JSON con "assets", "fields", "intervals" y, opcionalmente,
+    # "fill_policies", "grid" y "output_dir". Las rutas de "csv_dir" son relativas a este fichero.
+    with open("panel.txt", "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    builder = PanelBuilder(
+        config["assets"],
+        config["fields"],
+        config.get("output_dir", "data"),
+        fill_policies=config.get("fill_policies"),
+        grid=config.get("grid", "regular"),
+    )
+    builder.update(config["intervals"])
@@ -16,7 +16,9 @@ class UnifiedDataDownloader:
     Dependiendo del intervalo solicitado, se aplica:
       - Para intervalos históricos (ej: "1d", "1wk", "1mo"): descarga con period="max".
       - Para intervalos intradiarios (ej: "1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h"):
-        descarga en bloques (chunks) debido a las limitaciones de yfinance.
+        retoma la descarga desde la última vela guardada en el CSV, respetando la ventana hacia atrás
+        que permite yfinance para cada intervalo. Solo se divide en bloques si el tramo pendiente
+        supera lo que admite una petición.
     """
 
     def __init__(self, ticker, output_dir):
@@ -29,6 +31,19 @@ class UnifiedDataDownloader:
         os.makedirs(self.output_dir, exist_ok=True)
         # Definir los intervalos intradiarios reconocidos
         self.intraday_intervals = {"1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h"}
+        # Días hacia atrás que Yahoo Finance permite consultar para cada intervalo intradiario
+        self.intraday_lookback_days = {
+            "1m": 30,
+            "2m": 60,
+            "5m": 60,
+            "15m": 60,
+            "30m": 60,
+            "60m": 730,
+            "90m": 60,
+            "1h": 730
+        }
+        # Días máximos por petición cuando son menores que la ventana hacia atrás
+        self.intraday_request_days = {"1m": 7}
 
     def flatten_columns(self, df):
         """
@@ -93,40 +108,58 @@ class UnifiedDataDownloader:
 
         :param interval: Intervalo de datos, ej: "1d", "1m", etc.
         :param save_csv: Si True, guarda los datos en un archivo CSV.
-        :param historical_days: (Para datos intradiarios) Número total de días históricos a descargar.
-        :param chunk_days: (Para datos intradiarios) Número de días por bloque de descarga.
+        :param historical_days: (Para datos intradiarios) Días a descargar cuando no existe CSV previo
+                                (por defecto, todo lo que permite Yahoo para el intervalo).
+        :param chunk_days: (Para datos intradiarios) Días máximos por petición (por defecto, el límite de Yahoo).
         :return: DataFrame con los datos descargados.
         """
         if interval in self.intraday_intervals:
             # ----- Datos intradiarios -----
-            # Definir valores por defecto si no se especifican
-            if historical_days is None:
-                if interval in ['1m', '2m', '5m', '15m', '30m']:
-                    historical_days = 30
-                elif interval in ['60m', '1h']:
-                    historical_days = 90
-                elif interval == '90m':
-                    historical_days = 60
-                else:
-                    historical_days = 30
+            lookback_days = self.intraday_lookback_days[interval]
             if chunk_days is None:
-                chunk_days = 8 if interval == '1m' else 15
+                chunk_days = self.intraday_request_days.get(interval, lookback_days)
+
+            # Yahoo devuelve las criptomonedas en UTC y los CSV se guardan sin zona horaria
+            now = pd.Timestamp.now(tz="UTC").tz_localize(None)
+            # Se deja un día de margen para no pedir fuera de la ventana que permite Yahoo
+            earliest = now - timedelta(days=lookback_days) + timedelta(days=1)
+
+            filename = os.path.join(self.output_dir, f"{self.ticker}_{interval}.csv")
+            existing_data = pd.DataFrame()
+            last_datetime = pd.NaT
+            if os.path.isfile(filename):
+                print(f"El archivo {filename} ya existe. Leyendo datos previos para retomar descarga...")
+                try:
+                    existing_data = self.unify_columns(pd.read_csv(filename))
+                    if "datetime" in existing_data.columns:
+                        last_datetime = existing_data["datetime"].max()
+                except Exception as e:
+                    print(f"  Error al leer el archivo existente: {e}")
+                    existing_data = pd.DataFrame()
+
+            if pd.notna(last_datetime):
+                # Se retoma desde la última vela guardada (incluida, por si estaba incompleta)
+                start_date = max(last_datetime, earliest)
+                if last_datetime < earliest:
+                    print(f"  Aviso: Yahoo solo permite {lookback_days} días para {interval}; habrá un hueco desde {last_datetime}.")
+            else:
+                if historical_days is None:
+                    historical_days = lookback_days
+                start_date = max(now - timedelta(days=historical_days) + timedelta(days=1), earliest)
 
-            now = pd.Timestamp.now()
             end_date = now
-            start_date = now - timedelta(days=historical_days) + timedelta(days=1)
             max_chunk = timedelta(days=chunk_days)
 
             data_frames = []
             current_start = start_date
             while current_start < end_date:
                 current_end = min(current_start + max_chunk, end_date)
-                print(f"Descargando datos intradiarios de {current_start.date()} a {current_end.date()} para {self.ticker} | intervalo {interval}")
+                print(f"Descargando datos intradiarios de {current_start} a {current_end} para {self.ticker} | intervalo {interval}")
                 try:
                     df = yf.download(
                         self.ticker,
-                        start=current_start.strftime("%Y-%m-%d"),
-                        end=current_end.strftime("%Y-%m-%d"),
+                        start=current_start.to_pydatetime(),
+                        end=current_end.to_pydatetime(),
                         interval=interval,
                         progress=False
                     )
@@ -138,31 +171,22 @@ class UnifiedDataDownloader:
                     else:
                         print("  No se obtuvieron datos en este periodo.")
                 except Exception as e:
-                    print(f"  Error descargando datos de {current_start.date()} a {current_end.date()}: {e}")
+                    print(f"  Error descargando datos de {current_start} a {current_end}: {e}")
                 current_start = current_end
 
             if not data_frames:
-                print("No se han descargado datos intradiarios.")
-                result = pd.DataFrame()
-            else:
-                result = pd.concat(data_frames, ignore_index=True)
+                print("No se han descargado datos intradiarios nuevos.")
+            frames = [df for df in [existing_data] + data_frames if not df.empty]
+            if frames:
+                # keep='last' para que la vela reescrita sustituya a la versión guardada
+                result = pd.concat(frames, ignore_index=True)
                 if "datetime" in result.columns:
-                    result.drop_duplicates(subset=["datetime"], keep='first', inplace=True)
+                    result.drop_duplicates(subset=["datetime"], keep='last', inplace=True)
                     result.sort_values(by="datetime", inplace=True)
+            else:
+                result = pd.DataFrame()
 
-            if save_csv:
-                filename = os.path.join(self.output_dir, f"{self.ticker}_{interval}.csv")
-                if os.path.isfile(filename):
-                    print(f"El archivo {filename} ya existe. Leyendo datos previos para concatenar...")
-                    try:
-                        existing_data = pd.read_csv(filename)
-                        existing_data = self.unify_columns(existing_data)
-                        result = pd.concat([existing_data, result], ignore_index=True)
-                        if "datetime" in result.columns:
-                            result.drop_duplicates(subset=["datetime"], keep='first', inplace=True)
-                            result.sort_values(by="datetime", inplace=True)
-                    except Exception as e:
-                        print(f"  Error al leer el archivo existente: {e}")
+            if save_csv and data_frames:
                 result.to_csv(filename, index=False, lineterminator='\n')
                 print(f"Datos guardados/acumulados en: {filename}")
 
@@ -210,7 +234,7 @@ class UnifiedDataDownloader:
         :param intervals: Lista de intervalos deseados, por ejemplo: ["1d", "1wk", "1mo", "1m", "15m", ...]
         :param save_csv: Si True, guarda los datos en archivos CSV.
         :param intraday_params: Diccionario opcional para parámetros intradiarios por intervalo,
-                                ej: {"1m": {"historical_days": 30, "chunk_days": 8}, ...}
+                                ej: {"1m": {"historical_days": 7}, ...}
         :return: Diccionario con los intervalos como llaves y los DataFrames resultantes como valores.
         """
         results = {}
@@ -237,23 +261,11 @@ if __name__ == "__main__":
     # Combinar intervalos (ajusta según lo que necesites)
     intervals = historical_intervals + intraday_intervals
 
-    # 3. Opcional: parámetros específicos para datos intradiarios por intervalo
-    intraday_params = {
-        "1m": {"historical_days": 30, "chunk_days": 8},
-        "2m": {"historical_days": 30, "chunk_days": 15},
-        "5m": {"historical_days": 30, "chunk_days": 15},
-        "15m": {"historical_days": 30, "chunk_days": 15},
-        "30m": {"historical_days": 30, "chunk_days": 15},
-        "60m": {"historical_days": 90, "chunk_days": 15},
-        "90m": {"historical_days": 60, "chunk_days": 15},
-        "1h": {"historical_days": 90, "chunk_days": 15},
-    }
-
-    # 4. Procesar cada ticker
+    # 3. Procesar cada ticker
     for ticker in tickers:
         # Generar directorio de salida basado en el ticker (por ejemplo, "BTC-USD" -> carpeta "btc")
         folder_name = ticker.split("-")[0].lower()
         output_directory = os.path.join(folder_name)
         print(f"\nDescargando datos para {ticker} en carpeta: {output_directory}")
         downloader = UnifiedDataDownloader(ticker, output_directory)
-        downloader.download(intervals, save_csv=True, intraday_params=intraday_params)
+        downloader.download(intervals, save_csv=True)